@@ -4,17 +4,20 @@ iClicker Scraper Dashboard
 A web interface for extracting and browsing iClicker questions
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory
 from flask_socketio import SocketIO, emit
 import os
-import json
-import glob
+import sys
+import mimetypes
 import re
 import threading
 import time
 from pathlib import Path
 from datetime import datetime
 
+import ijson
+import orjson
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'iclicker-scraper-dashboard-secret'
 socketio = SocketIO(app, cors_allowed_origins="*")
@@ -24,13 +27,35 @@ BASE_DIR = Path(__file__).parent.parent
 QUESTIONS_DIR = BASE_DIR / "questions"
 IMAGES_DIR = BASE_DIR / "images"
 
+# The extraction scripts live in the project root
+sys.path.insert(0, str(BASE_DIR))
+from extract_course_activities import extract_course_activities, create_output_filename
+from rename_course_files import rename_files
+
+# When served behind Nginx, set this to an internal location (e.g. /_protected_images/)
+# so image bytes are sent by the proxy via X-Accel-Redirect instead of by Python
+IMAGES_ACCEL_REDIRECT = os.getenv('IMAGES_ACCEL_REDIRECT', '')
+
+# Course class-history URLs accepted by /extract
+_COURSE_URL_RE = re.compile(r'^https://student\.iclicker\.com/#/course/([a-f0-9-]{36})/class-history/?$')
+
+# Words of a course file name, which are separated by underscores
+_NAME_WORD_RE = re.compile(r'[^_]+')
+
+# Parsed course metadata keyed by JSON path, invalidated by file mtime
+_COURSES_CACHE: dict[str, tuple[int, dict]] = {}
+_COURSES_LOCK = threading.Lock()
+
+# Listing of extraction files in QUESTIONS_DIR, invalidated by the directory's mtime
+_DIR_CACHE = {'mtime': None, 'paths': []}
+
 class ExtractionManager:
     def __init__(self):
         self.current_extraction = None
         self.status = "idle"
         
-    def start_extraction(self, course_url):
-        """Start course extraction in background thread"""
+    def start_extraction(self, course_url, course_id=None, force=False):
+        """Start course extraction as a SocketIO background task"""
         if self.status == "running":
             return {"error": "Extraction already in progress"}
         
@@ -42,21 +67,14 @@ class ExtractionManager:
             'status': 'Starting...'
         }
         
-        # Start extraction in background thread
-        thread = threading.Thread(target=self._run_extraction, args=(course_url,))
-        thread.daemon = True
-        thread.start()
+        # Start extraction as a background task of whichever async mode SocketIO runs in
+        socketio.start_background_task(self._run_extraction, course_url, course_id, force)
         
         return {"success": True, "message": "Extraction started"}
     
-    def _run_extraction(self, course_url):
+    def _run_extraction(self, course_url, course_id=None, force=False):
         """Run the actual extraction process"""
         try:
-            # Import our extraction module
-            import sys
-            sys.path.append(str(BASE_DIR))
-            from extract_course_activities import extract_course_activities
-            
             # Update progress
             socketio.emit('extraction_progress', {
                 'progress': 10,
@@ -67,19 +85,32 @@ class ExtractionManager:
             result = extract_course_activities(
                 course_url=course_url,
                 output_dir=str(QUESTIONS_DIR),
-                headless=True
+                headless=True,
+                course_id=course_id,
+                force=force
             )
             
             if result and 'activities' in result:
-                # Update progress during extraction
+                # Update progress during extraction, throttled so large courses
+                # don't flood the socket with one frame per activity
                 total_activities = len(result['activities'])
+                last_emit = 0.0
+                last_pct = -1
+                pending = None
                 for i, activity in enumerate(result['activities']):
                     progress = 20 + (i / total_activities) * 60
-                    socketio.emit('extraction_progress', {
+                    pending = {
                         'progress': progress,
                         'status': f'Processing {activity.get("activity_name", "activity")}...'
-                    })
-                    time.sleep(0.1)  # Small delay for UI
+                    }
+                    if time.monotonic() - last_emit > 0.25 or int(progress) - last_pct >= 2:
+                        socketio.emit('extraction_progress', pending)
+                        last_emit = time.monotonic()
+                        last_pct = int(progress)
+                        pending = None
+                
+                if pending:
+                    socketio.emit('extraction_progress', pending)
                 
                 # Auto-rename files
                 socketio.emit('extraction_progress', {
@@ -109,58 +140,110 @@ class ExtractionManager:
     def _auto_rename_files(self, result):
         """Automatically rename extracted files"""
         try:
-            import sys
-            sys.path.append(str(BASE_DIR))
-            from rename_course_files import rename_files
-            
             # Find the JSON file that was just created
             course_id = result.get('course_id', '')
             timestamp = result.get('extraction_timestamp', '')
             
-            json_pattern = f"course_{course_id}_extraction_{timestamp}.json"
-            json_files = glob.glob(str(QUESTIONS_DIR / json_pattern))
+            json_file = create_output_filename(course_id, timestamp, str(QUESTIONS_DIR))
             
-            if json_files:
-                rename_files(json_files[0], dry_run=False)
+            if os.path.isfile(json_file):
+                rename_files(json_file, dry_run=False)
         except Exception as e:
             print(f"Auto-rename failed: {e}")
 
 extraction_manager = ExtractionManager()
 
+_SUMMARY_KEYS = ('course_id', 'extraction_timestamp', 'total_questions_extracted', 'total_images_downloaded')
+
+def _read_course_summary(json_file):
+    """Read the top-level counts of an extraction file without materializing its question tree"""
+    summary = {'activities': 0}
+    with open(json_file, 'rb') as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == 'activities.item' and event == 'start_map':
+                summary['activities'] += 1
+            elif prefix in _SUMMARY_KEYS and event in ('string', 'number'):
+                summary[prefix] = value
+    return summary
+
+def _capitalize_word(match):
+    """Capitalize one file-name word the way str.capitalize does"""
+    return match.group().capitalize()
+
+def _list_course_files():
+    """List complete extraction JSON files, rescanning only when the directory changes"""
+    try:
+        dir_mtime = os.stat(QUESTIONS_DIR).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    
+    if dir_mtime != _DIR_CACHE['mtime']:
+        with os.scandir(QUESTIONS_DIR) as entries:
+            _DIR_CACHE['paths'] = [
+                entry.path for entry in entries
+                if 'Complete_Extraction' in entry.name and entry.name.endswith('.json') and entry.is_file()
+            ]
+        _DIR_CACHE['mtime'] = dir_mtime
+    
+    return _DIR_CACHE['paths']
+
 def load_courses():
-    """Load extracted course data"""
+    """Load extracted course data, re-reading only files that changed on disk"""
     courses = []
     
-    # Find all complete extraction JSON files
-    json_files = glob.glob(str(QUESTIONS_DIR / "*Complete_Extraction*.json"))
-    
-    for json_file in json_files:
-        try:
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-            
-            # Extract course info
-            course_name = Path(json_file).stem.replace('_Complete_Extraction', '').split('_')
-            course_name = ' '.join([word.capitalize() for word in course_name[:-1]])  # Remove timestamp
-            
-            course_info = {
-                'name': course_name,
-                'file': json_file,
-                'id': data.get('course_id', ''),
-                'activities': len(data.get('activities', [])),
-                'questions': data.get('total_questions_extracted', 0),
-                'images': data.get('total_images_downloaded', 0),
-                'timestamp': data.get('extraction_timestamp', ''),
-                'data': data
-            }
-            courses.append(course_info)
-        except Exception as e:
-            print(f"Error loading {json_file}: {e}")
+    with _COURSES_LOCK:
+        # Find all complete extraction JSON files
+        json_files = _list_course_files()
+        
+        # Forget files that have been removed or renamed
+        for stale in set(_COURSES_CACHE) - set(json_files):
+            del _COURSES_CACHE[stale]
+        
+        for json_file in json_files:
+            try:
+                mtime = os.stat(json_file).st_mtime_ns
+                cached = _COURSES_CACHE.get(json_file)
+                if cached and cached[0] == mtime:
+                    courses.append(cached[1])
+                    continue
+                
+                data = _read_course_summary(json_file)
+                
+                # Extract course info (strip ".json" and the trailing timestamp)
+                stem = os.path.basename(json_file)[:-5]
+                base = stem.replace('_Complete_Extraction', '').rpartition('_')[0]
+                course_name = _NAME_WORD_RE.sub(_capitalize_word, base).replace('_', ' ')
+                
+                course_info = {
+                    'name': course_name,
+                    'file': json_file,
+                    'id': data.get('course_id', ''),
+                    'activities': data['activities'],
+                    'questions': data.get('total_questions_extracted', 0),
+                    'images': data.get('total_images_downloaded', 0),
+                    'timestamp': data.get('extraction_timestamp', '')
+                }
+                _COURSES_CACHE[json_file] = (mtime, course_info)
+                courses.append(course_info)
+            except Exception as e:
+                _COURSES_CACHE.pop(json_file, None)
+                print(f"Error loading {json_file}: {e}")
     
     # Sort by timestamp (most recent first)
     courses.sort(key=lambda x: x['timestamp'], reverse=True)
     return courses
 
+def load_course(course_id):
+    """Load a single course summary together with its full extraction data"""
+    course = next((c for c in load_courses() if c['id'] == course_id), None)
+    if not course:
+        return None
+    
+    with open(course['file'], 'rb') as f:
+        data = orjson.loads(f.read())
+    
+    return dict(course, data=data)
+
 @app.route('/')
 def dashboard():
     """Main dashboard page"""
@@ -176,17 +259,22 @@ def start_extraction():
     if not course_url:
         return jsonify({'error': 'Course URL is required'})
     
-    if 'student.iclicker.com/#/course/' not in course_url:
+    match = _COURSE_URL_RE.match(course_url)
+    if not match:
         return jsonify({'error': 'Invalid iClicker course URL'})
     
-    result = extraction_manager.start_extraction(course_url)
+    force = bool(request.json.get('force', False))
+    result = extraction_manager.start_extraction(course_url, course_id=match.group(1), force=force)
     return jsonify(result)
 
 @app.route('/course/<course_id>')
 def course_detail(course_id):
     """Course detail page"""
-    courses = load_courses()
-    course = next((c for c in courses if c['id'] == course_id), None)
+    try:
+        course = load_course(course_id)
+    except Exception as e:
+        print(f"Error loading course {course_id}: {e}")
+        course = None
     
     if not course:
         return "Course not found", 404
@@ -195,7 +283,7 @@ def course_detail(course_id):
 
 @app.route('/api/courses')
 def api_courses():
-    """API endpoint for course data"""
+    """API endpoint for course summaries"""
     return jsonify(load_courses())
 
 @app.route('/api/extraction/status')
@@ -210,11 +298,24 @@ def extraction_status():
 def serve_image(filename):
     """Serve image files"""
     try:
-        image_path = IMAGES_DIR / filename
-        if image_path.exists():
-            return send_file(str(image_path))
-        else:
+        # Reject anything that would resolve outside the images directory
+        images_root = IMAGES_DIR.resolve()
+        image_path = (images_root / filename).resolve()
+        if Path(filename).is_absolute() or images_root not in image_path.parents:
             return "Image not found", 404
+        
+        if not image_path.is_file():
+            return "Image not found", 404
+        
+        if not IMAGES_ACCEL_REDIRECT:
+            return send_from_directory(str(images_root), filename, conditional=True)
+        
+        # Let the reverse proxy stream the file with sendfile(2)
+        relative_path = image_path.relative_to(images_root).as_posix()
+        resp = Response()
+        resp.headers['X-Accel-Redirect'] = f"{IMAGES_ACCEL_REDIRECT.rstrip('/')}/{relative_path}"
+        resp.headers['Content-Type'] = mimetypes.guess_type(image_path.name)[0] or 'application/octet-stream'
+        return resp
     except Exception as e:
         return f"Error serving image: {e}", 500
 
@@ -10,15 +10,105 @@ import time
 import os
 import json
 import re
+import functools
+import hashlib
+import shutil
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
+from operator import itemgetter
 from typing import List, Dict, Tuple, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
+import orjson
+
+
+# Course class-history URLs and activity page URLs
+_COURSE_URL_RE = re.compile(r'https://student\.iclicker\.com/#/course/([^/]+)/class-history')
+_ACTIVITY_URL_RE = re.compile(r'/activity/([^/]+)(?:/|$)')
+
+# Question images carry alt text like "Question 12" and are hosted on reef-prod-storage
+_QNUM_RE = re.compile(r'Question\s+(\d+)')
+
+# Page elements the scraper waits on or interacts with
+_SESSION_LINK_SELECTOR = "a.session-link"
+_QUESTION_IMAGE_SELECTOR = "img[src*='reef-prod-storage'], img[alt*='Question']"
+_USERNAME_SELECTOR = "#input-email"
+_PASSWORD_SELECTOR = "#input-password"
+_COOKIE_ACCEPT_SELECTOR = "#onetrust-accept-btn-handler"
+
+# Filter the images matched by arguments[0] in the browser so only candidates cross the WebDriver boundary
+_QUESTION_IMAGES_JS = r"""
+return Array.from(document.querySelectorAll(arguments[0]))
+    .map(i => [i.src, i.alt || '', i.naturalWidth || i.width, i.naturalHeight || i.height])
+    .filter(([src, alt, w, h]) => src && (/Question\s+\d+/.test(alt) ||
+        (w > 200 && h > 100 && /reef-prod-storage.*attachments/.test(src))));
+"""
+
+# True once the images matched by arguments[0] exist and have all finished loading
+_QUESTION_IMAGES_READY_JS = r"""
+const imgs = Array.from(document.querySelectorAll(arguments[0]));
+return imgs.length > 0 && imgs.every(i => i.complete);
+"""
+
+# Read every session link's name and target in one WebDriver round-trip, for the links matched by arguments[0]
+_SESSION_LINKS_JS = r"""
+return Array.from(document.querySelectorAll(arguments[0])).map(a => {
+    const href = a.getAttribute('href') || a.getAttribute('ng-href') || '';
+    const m = href.match(/activity\/([^/?#]+)/);
+    return {text: a.innerText || '', id: m ? m[1] : null, href: a.href};
+});
+"""
+
+# Find and click the sign-in submit button without a round-trip per button
+_CLICK_SIGN_IN_JS = r"""
+const btn = Array.from(document.querySelectorAll("button[type='submit']"))
+    .find(b => (b.innerText || '').toLowerCase().includes('sign in'));
+if (btn) btn.click();
+return !!btn;
+"""
+
+# Requests the scraper never needs; question images stay allowed because the
+# collector relies on their natural dimensions
+_BLOCKED_URLS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*segment.com*',
+    '*segment.io*',
+    '*sentry.io*',
+    '*hotjar.com*',
+    '*nr-data.net*',
+    '*.woff',
+    '*.woff2',
+]
+
+# Concurrent image downloads; the work is network-bound so threads overlap well
+DOWNLOAD_WORKERS = 16
+
+# Past activities don't change, so their scraped questions are reused for this long
+# as long as the activity's session link still reads the same. The fingerprint check
+# rather than the age is what catches a list scraped during a live class, so the age
+# limit can be longer than a class; pass cache_max_age=0 to disable the cache
+ACTIVITY_CACHE_MAX_AGE = 7 * 24 * 3600
+
+# Signed-in browser state saved after a form login and restored on later runs;
+# kept next to this script so the CLI and the dashboard share it
+SESSION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions', '.session.json')
+
+# Resolved ChromeDriver path, reused across runs until Chrome rejects the driver;
+# kept next to this script so every working directory shares it
+_CHROMEDRIVER_PATH_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.wdm', 'chromedriver_path')
+
 
 @dataclass
 class CourseExtractionResult:
@@ -46,8 +136,7 @@ def extract_course_id_from_url(course_url: str) -> str:
     Raises:
         ValueError: If URL format is invalid
     """
-    pattern = r'https://student\.iclicker\.com/#/course/([^/]+)/class-history'
-    match = re.search(pattern, course_url)
+    match = _COURSE_URL_RE.search(course_url)
     
     if not match:
         raise ValueError(f"Invalid course URL format: {course_url}")
@@ -55,12 +144,33 @@ def extract_course_id_from_url(course_url: str) -> str:
     return match.group(1)
 
 
+def wait_for_session_links(driver, timeout: int = 20) -> bool:
+    """
+    Wait for the class-history page to render its session links.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        timeout: Maximum number of seconds to wait
+        
+    Returns:
+        True if session links appeared before the timeout
+    """
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, _SESSION_LINK_SELECTOR))
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
 def extract_activity_ids_from_page(driver) -> List[str]:
     """
     Extract all activity IDs from the course class-history page.
     
-    Since iClicker uses JavaScript session links, we need to click on each 
-    poll link and extract the activity ID from the resulting URL.
+    Activity IDs are read straight from the session link targets when the
+    links carry them. Otherwise, since iClicker uses JavaScript session links,
+    we click on each poll link and extract the activity ID from the resulting URL.
     
     Args:
         driver: Selenium WebDriver instance
@@ -71,13 +181,38 @@ def extract_activity_ids_from_page(driver) -> List[str]:
     activity_data = []
     
     try:
+        # Fast path: pull activity IDs from the link hrefs without navigating
+        processed_activities = set()
+        for link in driver.execute_script(_SESSION_LINKS_JS, _SESSION_LINK_SELECTOR):
+            link_text = link['text'].strip()
+            if not link['id'] or 'Poll' not in link_text or 'Class' not in link_text:
+                continue
+            
+            activity_identifier = link_text.split('\n')[0].strip()
+            if activity_identifier in processed_activities:
+                continue
+            
+            activity_data.append({
+                'activity_id': link['id'],
+                'activity_name': activity_identifier,
+                'activity_url': link['href'],
+                'link_text': link_text
+            })
+            processed_activities.add(activity_identifier)
+        
+        if activity_data:
+            print(f"   ✅ Read {len(activity_data)} activities from session links")
+            driver.activity_data = activity_data
+            return [item['activity_id'] for item in activity_data]
+        
         # Instead of caching elements, we'll find them fresh each iteration
         processed_activities = set()
         max_attempts = 20  # Prevent infinite loop
         
         for attempt in range(max_attempts):
-            # Find session links fresh each time
-            session_links = driver.find_elements(By.CSS_SELECTOR, "a.session-link")
+            # Find session links fresh each time, reading all their texts in one round-trip
+            session_links = driver.find_elements(By.CSS_SELECTOR, _SESSION_LINK_SELECTOR)
+            link_texts = driver.execute_script("return arguments[0].map(a => a.innerText || '');", session_links)
             
             if attempt == 0:
                 print(f"   Found {len(session_links)} session links")
@@ -85,9 +220,9 @@ def extract_activity_ids_from_page(driver) -> List[str]:
             # Find an unprocessed poll link
             found_unprocessed = False
             
-            for link in session_links:
+            for link, link_text in zip(session_links, link_texts):
                 try:
-                    link_text = link.text.strip()
+                    link_text = link_text.strip()
                     if 'Poll' in link_text and 'Class' in link_text:
                         # Create a unique identifier for this activity
                         activity_identifier = link_text.split('\n')[0].strip()
@@ -100,22 +235,25 @@ def extract_activity_ids_from_page(driver) -> List[str]:
                         
                         # Click the session link
                         driver.execute_script("arguments[0].click();", link)
-                        time.sleep(3)  # Wait for navigation
+                        try:
+                            WebDriverWait(driver, 10).until(EC.url_matches(r'/activity/[^/]+'))
+                        except TimeoutException:
+                            pass
                         
                         # Check if we're now on an activity page
                         current_url = driver.current_url
                         print(f"      Current URL: {current_url}")
                         
                         # Extract activity ID from URL
-                        activity_pattern = r'/activity/([^/]+)(?:/|$)'
-                        match = re.search(activity_pattern, current_url)
+                        match = _ACTIVITY_URL_RE.search(current_url)
                         
                         if match:
                             activity_id = match.group(1)
                             activity_info = {
                                 'activity_id': activity_id,
                                 'activity_name': activity_identifier,
-                                'activity_url': current_url
+                                'activity_url': current_url,
+                                'link_text': link_text
                             }
                             activity_data.append(activity_info)
                             processed_activities.add(activity_identifier)
@@ -125,7 +263,7 @@ def extract_activity_ids_from_page(driver) -> List[str]:
                         
                         # Go back to course page for next iteration
                         driver.back()
-                        time.sleep(3)  # Wait for page to load
+                        wait_for_session_links(driver, 10)
                         break  # Break inner loop to start fresh
                         
                 except Exception as e:
@@ -133,7 +271,7 @@ def extract_activity_ids_from_page(driver) -> List[str]:
                     # Try to get back to course page
                     try:
                         driver.back()
-                        time.sleep(2)
+                        wait_for_session_links(driver, 10)
                     except:
                         pass
                     continue
@@ -155,7 +293,7 @@ def extract_activity_ids_from_page(driver) -> List[str]:
         return []
 
 
-def extract_questions_from_activity(driver, activity_id: str, activity_name: str = None) -> List[Dict]:
+def extract_questions_from_activity(driver, activity_id: str, activity_name: str = None) -> Optional[List[Dict]]:
     """
     Extract questions from a single activity using proven extraction methods.
     
@@ -165,67 +303,61 @@ def extract_questions_from_activity(driver, activity_id: str, activity_name: str
         activity_name: Optional display name for the activity
         
     Returns:
-        List of question dictionaries
+        List of question dictionaries (empty if the activity has no question
+        images), or None if the activity page could not be scraped
     """
     questions_data = []
     
     try:
+        # Activity URLs only differ after the '#', so navigating between them keeps the
+        # document and the previous activity's images stay rendered for a moment
+        previous_images = driver.find_elements(By.CSS_SELECTOR, _QUESTION_IMAGE_SELECTOR)
+        
         # Navigate to activity questions page
         activity_url = f"https://student.iclicker.com/#/activity/{activity_id}/questions"
         print(f"   📝 Extracting from: {activity_url}")
         driver.get(activity_url)
-        time.sleep(8)  # Wait for page to load
         
-        # Use proven image extraction method from existing code
-        images = driver.find_elements(By.TAG_NAME, "img")
+        # Wait for the previous activity's view to be torn down before looking at images
+        if previous_images:
+            try:
+                WebDriverWait(driver, 15).until(EC.staleness_of(previous_images[0]))
+            except TimeoutException:
+                print(f"      ⚠️ The previous activity's page is still shown, skipping {activity_id}")
+                return None
+        
+        # Wait until the question images are in the DOM and have finished loading
+        # (or give up and scrape what's there)
+        try:
+            WebDriverWait(driver, 15).until(
+                lambda d: d.execute_script(_QUESTION_IMAGES_READY_JS, _QUESTION_IMAGE_SELECTOR)
+            )
+        except TimeoutException:
+            print(f"      ⚠️ Question images did not finish loading for {activity_id}")
+        
+        # Collect candidate images and their attributes in a single WebDriver round-trip
+        images = driver.execute_script(_QUESTION_IMAGES_JS, _QUESTION_IMAGE_SELECTOR)
+        # Every distinct image URL is kept; images without "Question N" alt text are
+        # numbered after the images collected before them
         question_images = []
-        seen_urls = set()
+        seen_srcs = set()
         
-        for img in images:
-            src = img.get_attribute('src') or ''
-            alt = img.get_attribute('alt') or ''
-            width = img.get_attribute('width') or '0'
-            height = img.get_attribute('height') or '0'
-            
-            is_question_image = False
-            question_number = None
-            
-            # Check alt text for "Question N"
-            if alt and 'Question' in alt:
-                alt_words = alt.split()
-                for i, word in enumerate(alt_words):
-                    if word == 'Question' and i + 1 < len(alt_words):
-                        try:
-                            question_number = int(alt_words[i + 1])
-                            is_question_image = True
-                            break
-                        except ValueError:
-                            pass
-            
-            # Check for reef-prod-storage images with good dimensions
-            if not is_question_image and 'reef-prod-storage' in src and 'attachments' in src:
-                try:
-                    w = int(width) if width.isdigit() else 0
-                    h = int(height) if height.isdigit() else 0
-                    if w > 200 and h > 100:
-                        is_question_image = True
-                        if question_number is None:
-                            question_number = len([q for q in question_images if q.get('question_number')]) + 1
-                except:
-                    pass
+        for src, alt, width, height in images:
+            if src in seen_srcs:
+                continue
+            seen_srcs.add(src)
             
-            if is_question_image and src and src not in seen_urls:
-                question_images.append({
-                    'question_number': question_number or len(question_images) + 1,
-                    'src': src,
-                    'alt': alt,
-                    'width': width,
-                    'height': height
-                })
-                seen_urls.add(src)
-        
-        # Sort by question number
-        question_images.sort(key=lambda x: x['question_number'])
+            match = _QNUM_RE.search(alt)
+            question_images.append({
+                'question_number': int(match.group(1)) if match else len(question_images) + 1,
+                'src': src,
+                'alt': alt,
+                'width': width,
+                'height': height
+            })
+        
+        # Sort by question number (stable, so same-numbered images keep page order)
+        question_images.sort(key=itemgetter('question_number'))
         
         # Convert to standard format
         for img_data in question_images:
@@ -242,18 +374,139 @@ def extract_questions_from_activity(driver, activity_id: str, activity_name: str
         
     except Exception as e:
         print(f"      ❌ Error extracting from activity {activity_id}: {e}")
+        return None
     
     return questions_data
 
 
-def download_images_for_activity(questions_data: List[Dict], activity_dir: str, activity_name: str) -> int:
+def _download_one(session: requests.Session, img_url: str, filename: str) -> Optional[int]:
+    """
+    Download a single question image.
+    
+    Args:
+        session: Shared HTTP session
+        img_url: URL of the question image
+        filename: Local path to save the image to
+        
+    Returns:
+        Size of the saved image in bytes, or None if the server did not return the image
+    """
+    with session.get(img_url, timeout=15, stream=True) as response:
+        if response.status_code != 200:
+            return None
+        
+        # Copy straight from the socket to disk instead of buffering the whole body;
+        # write to a temporary name so an interrupted download is never mistaken for a cached one
+        partial = f"{filename}.part"
+        response.raw.decode_content = True
+        with open(partial, 'wb') as f:
+            shutil.copyfileobj(response.raw, f, 64 * 1024)
+            size = f.tell()
+        os.replace(partial, filename)
+    
+    return size
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """
+    Place a copy of an already downloaded image at a new path.
+    
+    Hard-links when the filesystem allows it and falls back to a byte copy.
+    
+    Args:
+        src: Existing image file
+        dst: Destination path
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    
+    partial = f"{dst}.part"
+    try:
+        os.unlink(partial)
+    except FileNotFoundError:
+        pass
+    
+    try:
+        os.link(src, partial)
+    except OSError:
+        shutil.copyfile(src, partial)
+    os.replace(partial, dst)
+
+
+def _download_pending(session: requests.Session, executor: ThreadPoolExecutor,
+                      pending: List[Tuple[Dict, str]]) -> int:
+    """
+    Download the given question images concurrently.
+    
+    Args:
+        session: Shared HTTP session
+        executor: Thread pool the downloads are submitted to
+        pending: List of (question dictionary, local filename) pairs
+        
+    Returns:
+        Number of images successfully downloaded
+    """
+    downloaded_count = 0
+    
+    futures = {
+        executor.submit(_download_one, session, question['question_image_url'], filename): (question, filename)
+        for question, filename in pending
+    }
+    
+    for future in as_completed(futures):
+        question, filename = futures[future]
+        try:
+            size = future.result()
+            if size is not None:
+                # Add local path to question data
+                question['local_image_path'] = filename
+                question['image_size_bytes'] = size
+                downloaded_count += 1
+                
+        except Exception as e:
+            print(f"      ❌ Failed to download question {question['question_number']}: {e}")
+    
+    return downloaded_count
+
+
+def create_download_session() -> requests.Session:
+    """
+    Create a pooled HTTP session for image downloads.
+    
+    Returns:
+        Session with keep-alive connection pooling and retries on transient errors
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def download_images_for_activity(questions_data: List[Dict], activity_dir: str, activity_name: str,
+                                 session: Optional[requests.Session] = None,
+                                 executor: Optional[ThreadPoolExecutor] = None,
+                                 url_cache: Optional[Dict[str, str]] = None, force: bool = False) -> int:
     """
     Download images for all questions in an activity.
     
+    Images are fetched concurrently over a single pooled session so the
+    TLS connection to the storage host is reused between questions. Images
+    already present on disk are reused unless force is set.
+    
     Args:
         questions_data: List of question dictionaries
         activity_dir: Directory to save images
         activity_name: Display name for activity
+        session: Shared download session (a temporary one is created if omitted)
+        executor: Shared download thread pool (a temporary one is created if omitted)
+        url_cache: Image URL to local file map shared across activities; images
+            seen before are linked into place instead of downloaded again
+        force: Re-download images even if they already exist locally
         
     Returns:
         Number of images successfully downloaded
@@ -267,30 +520,108 @@ def download_images_for_activity(questions_data: List[Dict], activity_dir: str,
     os.makedirs(activity_dir, exist_ok=True)
     
     downloaded_count = 0
+    pending = []
+    images_per_number = {}
     
     for question in questions_data:
-        if question.get('question_image_url'):
+        if not question.get('question_image_url'):
+            continue
+        
+        # Several images can share a question number; give each its own file so
+        # concurrent downloads never write to the same path
+        number = question['question_number']
+        images_per_number[number] = images_per_number.get(number, 0) + 1
+        suffix = f"_{images_per_number[number]}" if images_per_number[number] > 1 else ""
+        filename = f"{activity_dir}/question_{number:02d}{suffix}.png"
+        
+        # Reuse images saved by a previous run
+        try:
+            size = os.stat(filename).st_size
+        except FileNotFoundError:
+            size = 0
+        if not force and size > 0:
+            question['local_image_path'] = filename
+            question['image_size_bytes'] = size
+            downloaded_count += 1
+            if url_cache is not None:
+                url_cache.setdefault(question['question_image_url'], filename)
+            continue
+        
+        # Reuse an identical image already fetched for another activity
+        cached = url_cache.get(question['question_image_url']) if url_cache is not None else None
+        if cached and os.path.exists(cached):
             try:
-                img_url = question['question_image_url']
-                response = requests.get(img_url, timeout=15)
-                
-                if response.status_code == 200:
-                    filename = f"{activity_dir}/question_{question['question_number']:02d}.png"
-                    
-                    with open(filename, 'wb') as f:
-                        f.write(response.content)
-                    
-                    # Add local path to question data
-                    question['local_image_path'] = filename
-                    question['image_size_bytes'] = len(response.content)
-                    downloaded_count += 1
-                    
-            except Exception as e:
-                print(f"      ❌ Failed to download question {question['question_number']}: {e}")
+                _link_or_copy(cached, filename)
+                question['local_image_path'] = filename
+                question['image_size_bytes'] = os.path.getsize(filename)
+                downloaded_count += 1
+                continue
+            except OSError as e:
+                print(f"      ⚠️ Could not reuse cached image for question {question['question_number']}: {e}")
+        
+        pending.append((question, filename))
+    
+    if not pending:
+        return downloaded_count
+    
+    owns_session = session is None
+    if owns_session:
+        session = create_download_session()
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+    
+    try:
+        downloaded_count += _download_pending(session, executor, pending)
+    finally:
+        if owns_executor:
+            executor.shutdown()
+        if owns_session:
+            session.close()
+    
+    if url_cache is not None:
+        for question, filename in pending:
+            if question.get('local_image_path') == filename:
+                url_cache[question['question_image_url']] = filename
     
     return downloaded_count
 
 
+@functools.lru_cache(maxsize=1)
+def _chromedriver_path() -> str:
+    """
+    Resolve the ChromeDriver binary once per process.
+    
+    The path found by a previous run is reused while the binary still
+    exists, so warm starts skip webdriver-manager's version resolution.
+    
+    Returns:
+        Path to the installed ChromeDriver executable
+    """
+    try:
+        with open(_CHROMEDRIVER_PATH_FILE, 'r') as f:
+            path = f.read().strip()
+        if os.path.isfile(path):
+            return path
+    except OSError:
+        pass
+    
+    path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(_CHROMEDRIVER_PATH_FILE), exist_ok=True)
+    with open(_CHROMEDRIVER_PATH_FILE, 'w') as f:
+        f.write(path)
+    return path
+
+
+def _forget_chromedriver_path() -> None:
+    """Drop the cached ChromeDriver path so the next lookup resolves it again."""
+    _chromedriver_path.cache_clear()
+    try:
+        os.remove(_CHROMEDRIVER_PATH_FILE)
+    except FileNotFoundError:
+        pass
+
+
 def load_credentials() -> Tuple[str, str]:
     """
     Load iClicker credentials from environment variables.
@@ -308,7 +639,9 @@ def load_credentials() -> Tuple[str, str]:
         # Try loading from questions/.env file
         try:
             username, password = load_credentials_from_file('questions/.env')
-        except:
+        except UnicodeDecodeError:
+            raise
+        except Exception:
             raise ValueError(
                 "Credentials not found. Please set ICLICKER_USERNAME and ICLICKER_PASSWORD "
                 "environment variables or create questions/.env file"
@@ -317,6 +650,22 @@ def load_credentials() -> Tuple[str, str]:
     return username, password
 
 
+def _clean_env_value(value: str) -> str:
+    """
+    Strip surrounding whitespace and one pair of matching quotes from a .env value.
+    
+    Args:
+        value: Raw value from the .env file
+        
+    Returns:
+        The value without its surrounding whitespace and quotes
+    """
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        return value[1:-1]
+    return value
+
+
 def load_credentials_from_file(env_file_path: str) -> Tuple[str, str]:
     """
     Load credentials from .env file.
@@ -327,16 +676,16 @@ def load_credentials_from_file(env_file_path: str) -> Tuple[str, str]:
     Returns:
         Tuple of (username, password)
     """
-    username = None
-    password = None
+    with open(env_file_path, 'r', encoding='utf-8') as f:
+        env = dict(
+            line.rstrip('\r\n').split('=', 1) for line in f
+            if '=' in line and not line.lstrip().startswith('#')
+        )
     
-    with open(env_file_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith('ICLICKER_USERNAME='):
-                username = line.split('=', 1)[1]
-            elif line.startswith('ICLICKER_PASSWORD='):
-                password = line.split('=', 1)[1]
+    # Values may be wrapped in one pair of quotes by .env writers; anything else is kept verbatim
+    env = {key.strip(): _clean_env_value(value) for key, value in env.items()}
+    username = env.get('ICLICKER_USERNAME')
+    password = env.get('ICLICKER_PASSWORD')
     
     if not username or not password:
         raise ValueError(f"Missing credentials in {env_file_path}")
@@ -360,8 +709,331 @@ def create_output_filename(course_id: str, timestamp: str, output_dir: str) -> s
     return os.path.join(output_dir, filename)
 
 
+def create_progress_filename(course_id: str, output_dir: str) -> str:
+    """
+    Create the filename of the per-activity progress log for a course.
+    
+    Args:
+        course_id: The course ID
+        output_dir: Output directory
+        
+    Returns:
+        Full path to the JSON-Lines progress file
+    """
+    filename = f"course_{course_id}_extraction.partial.jsonl"
+    return os.path.join(output_dir, filename)
+
+
+def load_progress(progress_file: str) -> Dict[str, Dict]:
+    """
+    Load activities completed by an earlier, interrupted extraction.
+    
+    Args:
+        progress_file: Path to the JSON-Lines progress file
+        
+    Returns:
+        Dictionary mapping activity ID to its saved activity data
+    """
+    completed = {}
+    
+    try:
+        with open(progress_file, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from an interrupted write
+                completed[record['activity_id']] = record
+    except FileNotFoundError:
+        pass
+    
+    return completed
+
+
+def _append_progress(progress, activity_data: Dict) -> None:
+    """
+    Durably append one finished activity to the progress log.
+    
+    Args:
+        progress: Progress file opened in binary append mode
+        activity_data: Activity result to record
+    """
+    line = orjson.dumps(activity_data)
+    progress.write(line + b"\n")
+    progress.flush()
+    os.fsync(progress.fileno())
+
+
+def _activity_cache_filename(activity_id: str, output_dir: str) -> str:
+    """
+    Create the filename of the cached question list for an activity.
+    
+    Args:
+        activity_id: The activity ID
+        output_dir: Output directory
+        
+    Returns:
+        Full path to the activity's cache file
+    """
+    return os.path.join(output_dir, ".activity_cache", f"{activity_id}.json")
+
+
+def activity_fingerprint(link_text: str) -> str:
+    """
+    Fingerprint an activity by the text of its session link on the course page.
+    
+    A question list scraped while a class is still running is only reused if the
+    link still reads the same; --force bypasses the cache entirely.
+    
+    Args:
+        link_text: Full text of the activity's session link
+        
+    Returns:
+        Hex digest identifying the activity's current state
+    """
+    return hashlib.sha1(link_text.encode('utf-8')).hexdigest()
+
+
+def load_cached_questions(activity_id: str, output_dir: str, fingerprint: str,
+                          max_age: float = ACTIVITY_CACHE_MAX_AGE) -> Optional[List[Dict]]:
+    """
+    Load questions scraped for an activity by a recent run.
+    
+    Args:
+        activity_id: The activity ID
+        output_dir: Output directory
+        fingerprint: Current fingerprint of the activity from activity_fingerprint
+        max_age: Maximum age of the cache file in seconds
+        
+    Returns:
+        Cached list of question dictionaries, or None if missing, stale or
+        scraped while the activity looked different
+    """
+    cache_file = _activity_cache_filename(activity_id, output_dir)
+    
+    try:
+        if time.time() - os.stat(cache_file).st_mtime > max_age:
+            return None
+        with open(cache_file, 'rb') as f:
+            cached = orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    
+    if not isinstance(cached, dict) or cached.get('fingerprint') != fingerprint:
+        return None
+    return cached.get('questions')
+
+
+def save_cached_questions(activity_id: str, output_dir: str, questions_data: List[Dict],
+                          fingerprint: str) -> None:
+    """
+    Cache the questions scraped for an activity.
+    
+    Args:
+        activity_id: The activity ID
+        output_dir: Output directory
+        questions_data: List of question dictionaries
+        fingerprint: Fingerprint of the activity when it was scraped
+    """
+    cache_file = _activity_cache_filename(activity_id, output_dir)
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    write_json_atomic(cache_file, {'fingerprint': fingerprint, 'questions': questions_data})
+
+
+def write_json_atomic(output_file: str, data) -> None:
+    """
+    Write JSON to a temporary file and move it into place.
+    
+    Args:
+        output_file: Final path of the JSON file
+        data: Data to serialize
+    """
+    tmp_file = f"{output_file}.tmp"
+    
+    with open(tmp_file, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    
+    os.replace(tmp_file, output_file)
+
+
+def create_driver(headless: bool = True) -> webdriver.Chrome:
+    """
+    Start a Chrome WebDriver configured for scraping.
+    
+    Args:
+        headless: Whether to run browser in headless mode
+        
+    Returns:
+        Selenium WebDriver instance
+    """
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1400,1000")
+    
+    # Trim Chrome features a scrape-only session never uses
+    for flag in ("--disable-gpu", "--disable-extensions", "--disable-background-networking",
+                 "--disable-background-timer-throttling", "--disable-renderer-backgrounding",
+                 "--disable-features=TranslateUI", "--mute-audio"):
+        chrome_options.add_argument(flag)
+    
+    # Return from driver.get at DOMContentLoaded; explicit waits cover the rest
+    chrome_options.page_load_strategy = 'eager'
+    
+    try:
+        driver = webdriver.Chrome(service=Service(_chromedriver_path()), options=chrome_options)
+    except SessionNotCreatedException:
+        # Chrome was updated past the cached driver; resolve a matching one
+        _forget_chromedriver_path()
+        driver = webdriver.Chrome(service=Service(_chromedriver_path()), options=chrome_options)
+    
+    # Drop analytics, telemetry and font requests at the network layer
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': _BLOCKED_URLS})
+    
+    return driver
+
+
+def save_session(driver, username: str, session_file: str = SESSION_FILE) -> None:
+    """
+    Save the browser's cookies and local storage for later runs.
+    
+    Args:
+        driver: Logged-in Selenium WebDriver instance
+        username: iClicker username the browser is signed in as
+        session_file: Path to write the session state to
+    """
+    state = {
+        'username': username,
+        'cookies': driver.get_cookies(),
+        'local_storage': driver.execute_script("return Object.assign({}, window.localStorage);")
+    }
+    
+    # The file holds live session tokens, so keep it private to the user
+    os.makedirs(os.path.dirname(session_file) or '.', exist_ok=True)
+    fd = os.open(session_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+
+
+def restore_session(driver, username: str, session_file: str = SESSION_FILE) -> bool:
+    """
+    Restore a saved browser session on the iClicker site.
+    
+    The browser must already be on https://student.iclicker.com. A session
+    saved for a different username is ignored. If the saved session is
+    missing or no longer valid, it is cleared again so the login form is shown.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        username: iClicker username the session must belong to
+        session_file: Path to the saved session state
+        
+    Returns:
+        True if the browser is signed in with the restored session
+    """
+    try:
+        with open(session_file, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return False
+    
+    if state.get('username') != username:
+        return False
+    
+    for cookie in state.get('cookies', []):
+        try:
+            driver.add_cookie(cookie)
+        except Exception:
+            pass
+    driver.execute_script(
+        "for (const [k, v] of Object.entries(arguments[0])) localStorage.setItem(k, v);",
+        state.get('local_storage', {})
+    )
+    driver.refresh()
+    
+    # Signed-out visitors get the login form; signed-in ones are sent on to their courses
+    try:
+        WebDriverWait(driver, 10).until(EC.any_of(
+            EC.presence_of_element_located((By.CSS_SELECTOR, _USERNAME_SELECTOR)),
+            EC.url_contains('#/course')
+        ))
+        if not driver.find_elements(By.CSS_SELECTOR, _USERNAME_SELECTOR):
+            return True
+    except TimeoutException:
+        pass
+    
+    driver.delete_all_cookies()
+    driver.execute_script("localStorage.clear();")
+    driver.get("https://student.iclicker.com")
+    return False
+
+
+def login(driver, username: str, password: str) -> None:
+    """
+    Log in to iClicker with the given browser session.
+    
+    A session saved by an earlier login is restored first, and the login
+    form is only filled in when that fails.
+    
+    Args:
+        driver: Selenium WebDriver instance
+        username: iClicker username
+        password: iClicker password
+    """
+    print("🔐 Logging in...")
+    driver.get("https://student.iclicker.com")
+    if restore_session(driver, username):
+        print("✅ Restored saved session")
+        return
+    
+    username_field = WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, _USERNAME_SELECTOR))
+    )
+    
+    # Handle cookie overlay
+    try:
+        overlay_btn = WebDriverWait(driver, 3).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, _COOKIE_ACCEPT_SELECTOR))
+        )
+        overlay_btn.click()
+        WebDriverWait(driver, 3).until(EC.invisibility_of_element(overlay_btn))
+    except:
+        pass
+    
+    # Login
+    password_field = driver.find_element(By.CSS_SELECTOR, _PASSWORD_SELECTOR)
+    
+    # The fields are empty on a fresh login page, so no clear() round-trip is needed
+    username_field.send_keys(username)
+    password_field.send_keys(password)
+    
+    # Submit
+    if not driver.execute_script(_CLICK_SIGN_IN_JS):
+        print("⚠️ Sign-in button not found")
+    
+    # The login form disappears once the sign-in redirect completes
+    try:
+        WebDriverWait(driver, 15).until(
+            EC.invisibility_of_element_located((By.CSS_SELECTOR, _PASSWORD_SELECTOR))
+        )
+        print("✅ Login successful")
+    except TimeoutException:
+        print("⚠️ Login form still visible, continuing anyway")
+        return
+    
+    try:
+        save_session(driver, username)
+    except Exception as e:
+        print(f"⚠️ Could not save session: {e}")
+
+
 def extract_course_activities(course_url: str, username: str = None, password: str = None, 
-                            output_dir: str = "questions", headless: bool = True) -> Dict:
+                            output_dir: str = "questions", headless: bool = True,
+                            course_id: str = None, driver=None, force: bool = False,
+                            cache_max_age: float = ACTIVITY_CACHE_MAX_AGE) -> Dict:
     """
     Extract all activities and questions from an iClicker course.
     
@@ -371,6 +1043,12 @@ def extract_course_activities(course_url: str, username: str = None, password: s
         password: iClicker password (optional if in environment)
         output_dir: Directory to save results
         headless: Whether to run browser in headless mode
+        course_id: Course ID already parsed from course_url (optional)
+        driver: Already logged-in WebDriver to reuse (optional); it is left open
+        force: Re-scrape and re-download everything, ignoring cached questions and
+            results saved by an interrupted run
+        cache_max_age: How long scraped question lists are reused, in seconds;
+            0 disables the activity cache
         
     Returns:
         Dictionary containing extraction results
@@ -379,65 +1057,42 @@ def extract_course_activities(course_url: str, username: str = None, password: s
     print(f"📚 Course URL: {course_url}")
     
     # Extract course ID
-    course_id = extract_course_id_from_url(course_url)
+    if not course_id:
+        course_id = extract_course_id_from_url(course_url)
     print(f"📋 Course ID: {course_id}")
     
+    owns_driver = driver is None
+    
     # Get credentials
-    if not username or not password:
+    if owns_driver and (not username or not password):
         username, password = load_credentials()
     
-    # Setup driver
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--window-size=1400,1000")
-    
     all_activities = []
+    total_questions = 0
+    total_images = 0
+    
+    # One pooled session and thread pool serve image downloads for every activity,
+    # and images shared between activities are only fetched once
+    session = create_download_session()
+    executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+    images_by_url = {}
+    progress = None
+    extraction_finished = False
+    
+    # Ensure output directory exists for the progress log and the results
+    os.makedirs(output_dir, exist_ok=True)
     
     try:
-        print("🚀 Setting up browser...")
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.implicitly_wait(5)
-        
-        # Login
-        print("🔐 Logging in...")
-        driver.get("https://student.iclicker.com")
-        time.sleep(3)
-        
-        # Handle cookie overlay
-        try:
-            overlay_btn = driver.find_element(By.CSS_SELECTOR, "#onetrust-accept-btn-handler")
-            overlay_btn.click()
-            time.sleep(1)
-        except:
-            pass
-        
-        # Login
-        username_field = driver.find_element(By.CSS_SELECTOR, "#input-email")
-        password_field = driver.find_element(By.CSS_SELECTOR, "#input-password")
-        
-        username_field.clear()
-        username_field.send_keys(username)
-        password_field.clear()
-        password_field.send_keys(password)
-        
-        # Submit
-        buttons = driver.find_elements(By.TAG_NAME, "button")
-        for btn in buttons:
-            if 'sign in' in btn.text.lower() and btn.get_attribute('type') == 'submit':
-                driver.execute_script("arguments[0].click();", btn)
-                break
-        
-        time.sleep(5)
-        print("✅ Login successful")
+        if owns_driver:
+            print("🚀 Setting up browser...")
+            driver = create_driver(headless)
+            login(driver, username, password)
         
         # Navigate to course class-history page
         print(f"📖 Loading course class-history page...")
         driver.get(course_url)
-        time.sleep(8)
+        if not wait_for_session_links(driver):
+            print("   ⚠️ No session links appeared on the class-history page")
         
         # Discover all activities
         print("🔍 Discovering activities...")
@@ -447,8 +1102,8 @@ def extract_course_activities(course_url: str, username: str = None, password: s
         print(f"   Page title: {page_title}")
         
         # Debug: Look for any links on the page
-        all_links = driver.find_elements(By.TAG_NAME, "a")
-        print(f"   Total links found on page: {len(all_links)}")
+        link_count = driver.execute_script("return document.getElementsByTagName('a').length")
+        print(f"   Total links found on page: {link_count}")
         
         activity_ids = extract_activity_ids_from_page(driver)
         
@@ -467,22 +1122,61 @@ def extract_course_activities(course_url: str, username: str = None, password: s
         
         # Extract questions from each activity
         activity_info_list = getattr(driver, 'activity_data', [])
+        info_by_id = {info['activity_id']: info for info in reversed(activity_info_list)}  # first match wins
+        
+        # Each finished activity is logged as it completes so an interrupted run can resume
+        progress_file = create_progress_filename(course_id, output_dir)
+        completed = {} if force else load_progress(progress_file)
+        progress = open(progress_file, 'ab')
         
         for i, activity_id in enumerate(activity_ids, 1):
             # Find the matching activity info
-            activity_info = next((info for info in activity_info_list if info['activity_id'] == activity_id), None)
+            activity_info = info_by_id.get(activity_id)
             activity_name = activity_info['activity_name'] if activity_info else f"Activity {i}"
             
             print(f"\\n📝 Processing {activity_name}: {activity_id}")
             
+            # Resumed results are only trusted while their images are still where they were
+            # saved; renaming a partial result moves them away
+            activity_data = completed.get(activity_id)
+            if activity_data and os.path.isdir(activity_data['image_directory']) and all(
+                    os.path.isfile(question['local_image_path'])
+                    for question in activity_data['questions'] if question.get('local_image_path')):
+                all_activities.append(activity_data)
+                total_questions += activity_data['questions_found']
+                total_images += activity_data['images_downloaded']
+                print(f"   ♻️ Reusing results saved by a previous run")
+                continue
+            if activity_data:
+                print(f"   ⚠️ Images saved by a previous run are missing, processing again")
+            
             try:
-                # Extract questions
-                questions_data = extract_questions_from_activity(driver, activity_id, activity_name)
+                # Extract questions, skipping the page load when a recent run already scraped
+                # the activity and its session link hasn't changed since
+                fingerprint = activity_fingerprint(activity_info['link_text']) if activity_info else None
+                questions_data = None
+                use_cache = fingerprint and cache_max_age > 0
+                if use_cache and not force:
+                    questions_data = load_cached_questions(activity_id, output_dir, fingerprint,
+                                                           cache_max_age)
+                if questions_data is not None:
+                    print(f"   ♻️ Using questions cached by a recent run")
+                else:
+                    questions_data = extract_questions_from_activity(driver, activity_id, activity_name)
+                    # Activities without question images are cached too, so later runs
+                    # don't wait for images that never appear
+                    if questions_data is not None and use_cache:
+                        # The cache only saves time later, so a failed write must not lose the activity
+                        try:
+                            save_cached_questions(activity_id, output_dir, questions_data, fingerprint)
+                        except OSError as e:
+                            print(f"   ⚠️ Could not cache questions: {e}")
                 
                 if questions_data:
                     # Create activity-specific directory for images
                     activity_dir = f"images/course_{course_id}/activity_{i}_{activity_id[:8]}"
-                    downloaded_count = download_images_for_activity(questions_data, activity_dir, activity_name)
+                    downloaded_count = download_images_for_activity(questions_data, activity_dir, activity_name,
+                                                                    session, executor, images_by_url, force)
                     
                     activity_data = {
                         'activity_id': activity_id,
@@ -496,6 +1190,9 @@ def extract_course_activities(course_url: str, username: str = None, password: s
                     }
                     
                     all_activities.append(activity_data)
+                    total_questions += len(questions_data)
+                    total_images += downloaded_count
+                    _append_progress(progress, activity_data)
                     
                     print(f"   ✅ Extracted {len(questions_data)} questions")
                     print(f"   ✅ Downloaded {downloaded_count} images to {activity_dir}/")
@@ -507,14 +1204,20 @@ def extract_course_activities(course_url: str, username: str = None, password: s
                 print(f"   ❌ Error processing {activity_name}: {e}")
                 continue
         
+        extraction_finished = True
+        
     except Exception as e:
         print(f"❌ Error during extraction: {e}")
         import traceback
         traceback.print_exc()
         
     finally:
-        if 'driver' in locals():
+        if owns_driver and driver is not None:
             driver.quit()
+        executor.shutdown()
+        session.close()
+        if progress is not None:
+            progress.close()
     
     # Save comprehensive results
     print("\\n💾 Saving comprehensive results...")
@@ -522,12 +1225,6 @@ def extract_course_activities(course_url: str, username: str = None, password: s
     timestamp = time.strftime("%Y%m%d_%H%M%S")
     output_file = create_output_filename(course_id, timestamp, output_dir)
     
-    # Ensure output directory exists
-    os.makedirs(output_dir, exist_ok=True)
-    
-    total_questions = sum(len(activity['questions']) for activity in all_activities)
-    total_images = sum(activity['images_downloaded'] for activity in all_activities)
-    
     result_data = {
         'course_id': course_id,
         'course_url': course_url,
@@ -539,11 +1236,17 @@ def extract_course_activities(course_url: str, username: str = None, password: s
         'activities': all_activities
     }
     
-    with open(output_file, 'w') as f:
-        json.dump(result_data, f, indent=2)
+    write_json_atomic(output_file, result_data)
     
     print(f"✅ Results saved to {output_file}")
     
+    # The progress log is only needed to resume an incomplete run
+    if extraction_finished:
+        try:
+            os.remove(create_progress_filename(course_id, output_dir))
+        except FileNotFoundError:
+            pass
+    
     # Summary
     print(f"\\n📊 COURSE EXTRACTION SUMMARY:")
     print(f"   Course ID: {course_id}")
@@ -553,8 +1256,10 @@ def extract_course_activities(course_url: str, username: str = None, password: s
     
     if all_activities:
         print(f"\\n📋 ACTIVITIES EXTRACTED:")
-        for activity in all_activities:
-            print(f"   • {activity['activity_name']} ({activity['activity_id'][:8]}...): {activity['questions_found']} questions, {activity['images_downloaded']} images")
+        print("\n".join(
+            f"   • {activity['activity_name']} ({activity['activity_id'][:8]}...): {activity['questions_found']} questions, {activity['images_downloaded']} images"
+            for activity in all_activities
+        ))
     
     return result_data
 
@@ -562,19 +1267,28 @@ def extract_course_activities(course_url: str, username: str = None, password: s
 if __name__ == "__main__":
     import sys
     
-    # Allow course URL as command line argument
-    if len(sys.argv) > 1:
-        course_url = sys.argv[1]
-    else:
+    # Allow one or more course URLs as command line arguments, plus --force to refresh everything
+    force = '--force' in sys.argv[1:]
+    course_urls = [arg for arg in sys.argv[1:] if arg != '--force']
+    if not course_urls:
         # Default to the new course URL
-        course_url = "https://student.iclicker.com/#/course/67d4f5a8-cbd4-41e0-870c-aa09b361da0c/class-history"
+        course_urls = ["https://student.iclicker.com/#/course/67d4f5a8-cbd4-41e0-870c-aa09b361da0c/class-history"]
     
-    print(f"🎯 Extracting from course: {course_url}")
-    
-    result = extract_course_activities(
-        course_url=course_url,
-        output_dir="questions",
-        headless=False  # Show browser for debugging
-    )
+    # Start the browser and log in once, then reuse it for every course
+    driver = create_driver(headless=False)  # Show browser for debugging
+    try:
+        login(driver, *load_credentials())
+        
+        for course_url in course_urls:
+            print(f"🎯 Extracting from course: {course_url}")
+            
+            result = extract_course_activities(
+                course_url=course_url,
+                output_dir="questions",
+                driver=driver,
+                force=force
+            )
+    finally:
+        driver.quit()
     
     print("\\n🎉 Course extraction complete!")
@@ -4,18 +4,49 @@ Simple script to rename extracted course files with meaningful names.
 Renames JSON file and image directories to include course name and class information.
 """
 
-import json
 import os
 import shutil
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import ijson
+import orjson
+
+from extract_course_activities import write_json_atomic
+
+# Concurrent activity directory moves during --apply
+MOVE_WORKERS = 8
+
+# Display names of known courses, keyed by iClicker course ID
+COURSE_NAMES = {
+    "a6f87d72-bca6-49fe-9497-a1728cf38733": "Gross_Anatomy_2025",
+    "67d4f5a8-cbd4-41e0-870c-aa09b361da0c": "Gross_Anatomy_Embryo_Imaging_STL_FA25",
+}
+
+# Patterns used when building filesystem-safe names
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s-]')
+_SEPARATORS_RE = re.compile(r'[-\s]+')
+_CLASS_NUM_RE = re.compile(r'Class (\d+)')
+
+
+# ASCII fast path for sanitize_name: drop the characters the first regex removes and
+# turn hyphens and whitespace into spaces so split() can collapse them
+_SANITIZE_TABLE = {
+    c: (' ' if chr(c) == '-' or chr(c).isspace() else None)
+    for c in range(128)
+    if not (chr(c).isalnum() or chr(c) == '_')
+}
+
 
 def sanitize_name(name):
     """Convert name to filesystem-safe format"""
+    if name.isascii():
+        return '_'.join(name.translate(_SANITIZE_TABLE).split()).strip('_')
+    
     # Replace problematic characters with underscores
-    name = re.sub(r'[^\w\s-]', '', name)  # Remove special chars except word chars, spaces, hyphens
-    name = re.sub(r'[-\s]+', '_', name)   # Replace spaces and hyphens with underscores
+    name = _SPECIAL_CHARS_RE.sub('', name)  # Remove special chars except word chars, spaces, hyphens
+    name = _SEPARATORS_RE.sub('_', name)    # Replace spaces and hyphens with underscores
     return name.strip('_')
 
 
@@ -23,16 +54,56 @@ def extract_course_info(json_data):
     """Extract course information from JSON data"""
     course_id = json_data.get('course_id', '')
     
-    # Identify course based on course ID or other metadata
-    if course_id == "a6f87d72-bca6-49fe-9497-a1728cf38733":
-        course_name = "Gross_Anatomy_2025"
-    elif course_id == "67d4f5a8-cbd4-41e0-870c-aa09b361da0c":
-        course_name = "Gross_Anatomy_Embryo_Imaging_STL_FA25"
-    else:
-        # Default fallback
-        course_name = f"Course_{course_id[:8]}"
-    
-    return course_name
+    # Identify course based on course ID, falling back to a short-ID name
+    return COURSE_NAMES.get(course_id, f"Course_{course_id[:8]}")
+
+
+def _index_activity_dirs(course_dir):
+    """Map the short activity ID that ends each activity directory name to that name"""
+    with os.scandir(course_dir) as entries:
+        return {entry.name[-8:]: entry.name for entry in entries if entry.is_dir()}
+
+
+def _find_activity_dir(dir_index, short_id):
+    """Look up an activity directory name by short ID, falling back to a substring match"""
+    name = dir_index.get(short_id)
+    if name is None:
+        name = next((n for n in dir_index.values() if short_id in n), None)
+    return name
+
+
+_PLAN_KEYS = ('course_id', 'extraction_timestamp')
+_PLAN_ACTIVITY_KEYS = ('activity_id', 'activity_name', 'questions_found')
+
+
+def _load_plan_metadata(json_path):
+    """Read the fields needed to plan renames without materializing the question tree"""
+    metadata = {'activities': []}
+    with open(json_path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == 'activities.item' and event == 'start_map':
+                metadata['activities'].append({})
+            elif prefix.startswith('activities.item.'):
+                key = prefix[len('activities.item.'):]
+                if key in _PLAN_ACTIVITY_KEYS and event in ('string', 'number'):
+                    metadata['activities'][-1][key] = value
+            elif prefix in _PLAN_KEYS and event in ('string', 'number'):
+                metadata[prefix] = value
+    return metadata
+
+
+def _load_json(json_path):
+    """Load a full extraction file"""
+    with open(json_path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def _fast_move(src, dst):
+    """Rename in a single syscall, falling back to shutil.move across filesystems"""
+    try:
+        os.rename(src, dst)
+    except OSError:
+        shutil.move(src, dst)
 
 
 def rename_files(json_path, dry_run=True):
@@ -43,9 +114,8 @@ def rename_files(json_path, dry_run=True):
     print(f"🔍 Mode: {'DRY RUN' if dry_run else 'APPLY CHANGES'}")
     print()
     
-    # Load JSON data
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+    # Load only what planning needs; the full document is read when applying
+    data = _load_plan_metadata(json_path)
     
     course_name = extract_course_info(data)
     timestamp = data.get('extraction_timestamp', 'unknown')
@@ -62,24 +132,26 @@ def rename_files(json_path, dry_run=True):
     new_json_path = json_dir / new_json_name
     
     if old_json_path.name != new_json_name:
-        renames.append(('file', old_json_path, new_json_path))
+        renames.append(('file', os.fspath(old_json_path), os.fspath(new_json_path)))
     
     # 2. Rename main image directory
     old_course_dir = project_dir / "images" / f"course_{data['course_id']}"
     new_course_dir = project_dir / "images" / course_name
     
-    if old_course_dir.exists():
-        renames.append(('dir', old_course_dir, new_course_dir))
+    old_course_exists = old_course_dir.exists()
+    if old_course_exists:
+        renames.append(('dir', os.fspath(old_course_dir), os.fspath(new_course_dir)))
     
     # 3. Rename activity directories
-    if old_course_dir.exists():
+    if old_course_exists:
         activity_renames = []
+        dir_index = _index_activity_dirs(old_course_dir)
         for activity in data.get('activities', []):
             activity_name = activity.get('activity_name', '')
             activity_id = activity.get('activity_id', '')
             
             # Parse class number from activity name (e.g., "Class 11 - Poll")
-            class_match = re.search(r'Class (\d+)', activity_name)
+            class_match = _CLASS_NUM_RE.search(activity_name)
             if class_match:
                 class_num = int(class_match.group(1))
                 class_label = f"Class_{class_num:02d}"
@@ -96,12 +168,11 @@ def rename_files(json_path, dry_run=True):
             short_id = activity_id[:8]
             
             # Find current directory
-            for item in old_course_dir.iterdir():
-                if item.is_dir() and short_id in item.name:
-                    new_activity_name = f"{class_label}_{activity_type}_{short_id}"
-                    new_activity_path = new_course_dir / new_activity_name
-                    activity_renames.append(('activity_dir', item, new_activity_path, activity))
-                    break
+            dir_name = _find_activity_dir(dir_index, short_id)
+            if dir_name:
+                new_activity_name = f"{class_label}_{activity_type}_{short_id}"
+                new_activity_path = os.fspath(new_course_dir / new_activity_name)
+                activity_renames.append(('activity_dir', os.fspath(old_course_dir / dir_name), new_activity_path, activity))
         
         renames.extend(activity_renames)
     
@@ -116,8 +187,8 @@ def rename_files(json_path, dry_run=True):
     for rename_type, old_path, new_path, *extra in renames:
         if rename_type == 'file':
             print(f"📄 JSON File:")
-            print(f"   From: {old_path.name}")
-            print(f"   To:   {new_path.name}")
+            print(f"   From: {os.path.basename(old_path)}")
+            print(f"   To:   {os.path.basename(new_path)}")
             print()
         elif rename_type == 'dir':
             print(f"📁 Course Directory:")
@@ -155,51 +226,58 @@ def rename_files(json_path, dry_run=True):
                 continue
             elif rename_type == 'dir':
                 print(f"📁 Moving course directory...")
-                new_path.parent.mkdir(parents=True, exist_ok=True)
-                shutil.move(str(old_path), str(new_path))
-                path_mapping[str(old_path)] = str(new_path)
+                os.makedirs(os.path.dirname(new_path), exist_ok=True)
+                _fast_move(old_path, new_path)
+                path_mapping[old_path] = new_path
                 print(f"   ✅ {old_path} -> {new_path}")
                 main_dir_moved = True
                 new_course_dir_actual = new_path
         
-        # Now handle activity directories within the moved directory
-        for rename_type, old_path, new_path, *extra in renames:
-            if rename_type == 'activity_dir':
-                activity = extra[0]
-                # Find the activity directory in the new location
-                activity_id = activity['activity_id']
-                short_id = activity_id[:8]
-                
-                # Look for the directory in the new course directory
-                current_activity_dir = None
-                for item in new_course_dir_actual.iterdir():
-                    if item.is_dir() and short_id in item.name:
-                        current_activity_dir = item
-                        break
-                
-                if current_activity_dir:
-                    print(f"📂 Moving activity directory...")
-                    shutil.move(str(current_activity_dir), str(new_path))
-                    path_mapping[str(current_activity_dir)] = str(new_path)
-                    print(f"   ✅ {current_activity_dir} -> {new_path}")
-                else:
-                    print(f"   ⚠️ Could not find activity directory for {activity['activity_name']}")
+        # Now handle activity directories within the moved directory; the moves are
+        # independent metadata operations, so they run concurrently
+        activity_moves = []
+        with ThreadPoolExecutor(max_workers=MOVE_WORKERS) as executor:
+            for rename_type, old_path, new_path, *extra in renames:
+                if rename_type == 'activity_dir':
+                    activity = extra[0]
+                    # The planned directory name survives the course directory move
+                    current_activity_dir = os.path.join(new_course_dir_actual, os.path.basename(old_path)) if main_dir_moved else None
+                    
+                    if current_activity_dir:
+                        future = executor.submit(_fast_move, current_activity_dir, new_path)
+                        activity_moves.append((future, old_path, current_activity_dir, new_path, activity))
+                    else:
+                        print(f"   ⚠️ Could not find activity directory for {activity['activity_name']}")
+        
+        # Report in plan order once every move has finished
+        for future, old_path, current_activity_dir, new_path, activity in activity_moves:
+            print(f"📂 Moving activity directory...")
+            try:
+                future.result()
+            except OSError as e:
+                print(f"   ❌ Could not move {activity['activity_name']}: {e}")
+                continue
+            # Keyed by the original location, which is what the JSON paths still use
+            path_mapping[old_path] = new_path
+            print(f"   ✅ {current_activity_dir} -> {new_path}")
         
         # Update JSON paths
         print(f"📝 Updating JSON file paths...")
-        updated_data = update_json_paths(data, path_mapping)
+        updated_data = update_json_paths(_load_json(json_path), path_mapping)
         
         # Write updated JSON to new location
         for rename_type, old_path, new_path, *extra in renames:
             if rename_type == 'file':
-                with open(new_path, 'w') as f:
-                    json.dump(updated_data, f, indent=2)
+                write_json_atomic(new_path, updated_data)
                 print(f"   ✅ Updated JSON saved to {new_path}")
                 
                 # Remove old JSON file
-                if old_path != new_path and old_path.exists():
-                    old_path.unlink()
-                    print(f"   🗑️  Removed old JSON file")
+                if old_path != new_path:
+                    try:
+                        os.unlink(old_path)
+                        print(f"   🗑️  Removed old JSON file")
+                    except FileNotFoundError:
+                        pass
                 break
         
         print()
@@ -213,36 +291,36 @@ def rename_files(json_path, dry_run=True):
 
 
 def update_json_paths(data, path_mapping):
-    """Update local image paths in JSON data based on directory renames"""
-    updated_data = data.copy()
+    """Update local image paths in JSON data in place based on directory renames"""
+    # Longest prefix first so the most specific directory rename wins
+    mappings = sorted(path_mapping.items(), key=lambda item: len(item[0]), reverse=True)
     
-    if 'activities' in updated_data:
-        for activity in updated_data['activities']:
-            if 'questions' in activity:
-                for question in activity['questions']:
-                    if 'local_image_path' in question:
-                        old_path = question['local_image_path']
-                        
-                        # Update path based on mappings
-                        new_path = old_path
-                        for old_dir, new_dir in path_mapping.items():
-                            if old_path.startswith(old_dir):
-                                new_path = old_path.replace(old_dir, new_dir)
-                                break
-                        
-                        question['local_image_path'] = new_path
+    activities = data.get('activities')
+    if activities:
+        for activity in activities:
+            for question in activity.get('questions', ()):
+                old_path = question.get('local_image_path')
+                if old_path is None:
+                    continue
+                
+                # Update path based on mappings; unmatched paths are left untouched
+                startswith = old_path.startswith
+                for old_dir, new_dir in mappings:
+                    if startswith(old_dir):
+                        question['local_image_path'] = new_dir + old_path[len(old_dir):]
+                        break
             
             # Update image_directory field
             if 'image_directory' in activity:
                 old_dir = activity['image_directory']
                 new_dir = old_dir
-                for old_path, new_path in path_mapping.items():
+                for old_path, new_path in mappings:
                     if old_dir.startswith(old_path):
-                        new_dir = old_dir.replace(old_path, new_path)
+                        new_dir = new_path + old_dir[len(old_path):]
                         break
                 activity['image_directory'] = new_dir
     
-    return updated_data
+    return data
 
 
 def main():